@@ -0,0 +1,68 @@
+"""Compare /chat first-turn latency with and without hedging on a heavy-tailed fake backend.
+
+The fake model's latency is Pareto-distributed (alpha 1.5), so p99 is many
+times the median. Every request opens a new session, the only kind /chat
+hedges.
+
+    python bench_hedging.py --requests 600 --latency-ms 100
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+os.environ.setdefault("MODEL_BACKEND", "fake")
+os.environ.setdefault("FAKE_LATENCY_DIST", "pareto")
+os.environ.setdefault("PROGRAM_API_KEY", "bench-key")
+os.environ.setdefault("UPSTREAM_RATE_LIMIT", "100000")
+os.environ.setdefault("UPSTREAM_BURST", "100000")
+
+import httpx
+
+from loadtest import percentile
+
+
+async def run(main, requests, concurrency):
+    headers = {"Authorization": f"Bearer {main.PROGRAM_API_KEY}"}
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def first_turn(client):
+        payload = {"session_id": str(uuid.uuid4()), "persona": "Alan Turing", "message": "Who are you?"}
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/chat", json=payload, headers=headers)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    calls_before = main.get_model().calls
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        await asyncio.gather(*[first_turn(client) for _ in range(requests)])
+    latencies.sort()
+    return percentile(latencies, 50) * 1000, percentile(latencies, 99) * 1000, main.get_model().calls - calls_before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark hedged first turns on /chat.")
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--max-ratio", type=float, default=0.1)
+    args = parser.parse_args()
+
+    os.environ["FAKE_LATENCY_MS"] = str(args.latency_ms)
+    import main as chat_main
+
+    for name, hedger in (("no hedging", None),
+                         ("hedging", chat_main.Hedger(percentile=args.percentile, max_ratio=args.max_ratio))):
+        chat_main.hedger = hedger
+        p50, p99, calls = asyncio.run(run(chat_main, args.requests, args.concurrency))
+        print(f"{name:<11} p50 {p50:7.1f} ms   p99 {p99:7.1f} ms   "
+              f"upstream calls {calls} (+{(calls / args.requests - 1) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Measure Streamlit rerun time of the chat apps as the conversation grows.
+
+Runs each app headlessly with Streamlit's AppTest against the fake model
+backend, preloading chat_history with N messages.
+
+    python bench_rerun.py --sizes 10 100 1000 --runs 5
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("MODEL_BACKEND", "fake")
+
+from streamlit.testing.v1 import AppTest
+
+
+def fake_history(size):
+    history = []
+    for i in range(size):
+        if i % 2 == 0:
+            history.append(('You', f"Question number {i} about the history of science?"))
+        else:
+            history.append(('Bot', f"Answer number {i}. " + "A fairly long reply sentence. " * 15))
+    return history
+
+
+def time_rerun(script, size, runs):
+    """Return the mean seconds per rerun of script with `size` messages of history."""
+    app = AppTest.from_file(script, default_timeout=60)
+    app.run()
+    app.session_state['chat_history'] = fake_history(size)
+    app.run()  # Warm up with the history in place
+    start = time.perf_counter()
+    for _ in range(runs):
+        app.run()
+    return (time.perf_counter() - start) / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat app reruns by history length.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scripts", nargs="+", default=["chat.py", "characterBasedChat.py"])
+    args = parser.parse_args()
+
+    for script in args.scripts:
+        for size in args.sizes:
+            print(f"{script:<24} {size:>5} messages  {time_rerun(script, size, args.runs) * 1000:8.1f} ms/rerun")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Measure the per-request overhead each session backend adds to /chat.
+
+Times one load + append_turn round trip (what /chat does per request) for sessions
+with a growing history, against memory, SQLite (WAL) and the RESP stand-in.
+
+    python bench_session_store.py --requests 2000 --turns 20
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from resp_standin import serve_in_background
+from session_store import MemorySessionStore, RedisSessionStore, SQLiteSessionStore
+
+
+def bench(store, requests, turns):
+    """Return mean milliseconds per load+append for sessions holding `turns` exchanges."""
+    session_ids = [f"bench-{i}" for i in range(100)]
+    for session_id in session_ids:
+        history = []
+        for turn in range(turns):
+            history.append(("User", f"Question {turn} " + "x" * 80))
+            history.append(("Isaac Newton", f"Answer {turn} " + "y" * 400))
+        store.save(session_id, {"persona": "Isaac Newton", "chat_history": history})
+
+    start = time.perf_counter()
+    for i in range(requests):
+        session_id = session_ids[i % len(session_ids)]
+        store.load(session_id)
+        store.append_turn(session_id, "Isaac Newton", "Question", "Answer")
+    return (time.perf_counter() - start) / requests * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark session store backends.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--turns", type=int, default=20, help="exchanges already in each session")
+    args = parser.parse_args()
+
+    server = serve_in_background()
+    host, port = server.server_address
+    with tempfile.TemporaryDirectory() as tmp:
+        stores = {
+            "memory": MemorySessionStore(),
+            "sqlite": SQLiteSessionStore(os.path.join(tmp, "bench.db")),
+            "redis (stand-in)": RedisSessionStore(f"redis://{host}:{port}/0")
+        }
+        for name, store in stores.items():
+            print(f"{name:<18} {bench(store, args.requests, args.turns):.3f} ms/request")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare the old per-chunk streaming loop with chat_ui.render_stream.
+
+Streams a long fake reply and counts placeholder updates (each one is a
+websocket message to the browser), bytes sent and server CPU time.
+
+    python bench_streaming.py --chunks 500 --chunk-interval-ms 5
+"""
+import argparse
+import time
+
+from chat_ui import render_stream
+from model_backend import FakeModel
+
+
+class RecordingPlaceholder:
+    """Records what would be sent to the browser instead of sending it."""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes_sent = 0
+
+    def markdown(self, text):
+        self.messages += 1
+        self.bytes_sent += len(text.encode())
+
+
+def render_per_chunk(response_chunks, placeholder):
+    # The loop both apps used before render_stream
+    full_response = ""
+    for chunk in response_chunks:
+        full_response += chunk.text
+        placeholder.markdown(full_response + "▌")
+    placeholder.markdown(full_response)
+    return full_response
+
+
+def measure(render, reply, chunks, chunk_interval_ms):
+    backend = FakeModel(latency_ms=0, latency_dist="constant", chunk_count=chunks,
+                        chunk_interval_ms=chunk_interval_ms)
+    placeholder = RecordingPlaceholder()
+    cpu_start = time.process_time()
+    render(backend.stream_chunks(reply), placeholder)
+    return placeholder, (time.process_time() - cpu_start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark streaming renderers.")
+    parser.add_argument("--chunks", type=int, default=500)
+    parser.add_argument("--chunk-interval-ms", type=float, default=5)
+    parser.add_argument("--reply-chars", type=int, default=20000)
+    args = parser.parse_args()
+
+    reply = ("Streaming replies should not cost quadratic time. " * (args.reply_chars // 50 + 1))[:args.reply_chars]
+    for name, render in (("per-chunk (before)", render_per_chunk), ("render_stream", render_stream)):
+        placeholder, cpu_ms = measure(render, reply, args.chunks, args.chunk_interval_ms)
+        print(f"{name:<20} {placeholder.messages:>5} updates  "
+              f"{placeholder.bytes_sent / 1024:9.1f} KiB sent  {cpu_ms:7.1f} ms CPU")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,10 @@
 from dotenv import load_dotenv
 load_dotenv()
 import streamlit as st
-import os
-import google.generativeai as genai
+from chat_ui import load_model, load_prompt_template, render_history, render_stream
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-
-# Initialize the Gemini model
-model = genai.GenerativeModel('gemini-1.5-flash')
+# Gemini model, built once per process and shared across sessions
+model = load_model()
 
 # Set up Streamlit page
 st.set_page_config(page_title='Character-based Chatbot', layout='centered')
@@ -50,9 +46,8 @@ if selected_persona != st.session_state['last_persona']:
 # Function to generate response
 def get_gemini_response(user_message):
     try:
-        # Load prompt template from file
-        with open('prompt_template.txt', 'r') as file:
-            prompt_template = file.read().strip()
+        # Prompt template is read from file once per process
+        prompt_template = load_prompt_template()
 
         # Format the prompt with persona details
         persona_instruction = prompt_template.format(
@@ -81,19 +76,12 @@ if submit_button and user_input.strip():
     with st.spinner("Thinking..."):
         response_chunks = get_gemini_response(user_input.strip())
         if response_chunks:
-            full_response = ""
             response_placeholder = st.empty()
-            for chunk in response_chunks:
-                full_response += chunk.text
-                response_placeholder.markdown(full_response + "▌")
+            full_response = render_stream(response_chunks, response_placeholder)
             st.session_state['chat_history'].append(('Bot', full_response))
 
     st.rerun()
 
 # Display chat history
 st.subheader('Chat History:')
-for role, text in reversed(st.session_state['chat_history']):
-    if role == 'You':
-        st.markdown(f"**You:** {text}")
-    else:
-        st.markdown(f"**{st.session_state['persona']}:** {text}")
\ No newline at end of file
+render_history(st.session_state['chat_history'], bot_label=st.session_state['persona'], newest_first=True)
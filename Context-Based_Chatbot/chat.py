@@ -1,14 +1,10 @@
 from dotenv import load_dotenv
 load_dotenv()
 import streamlit as st
-import os
-import google.generativeai as genai
+from chat_ui import load_model, render_history, render_stream
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-
-# Initialize the Gemini model and chat history
-model = genai.GenerativeModel('gemini-1.5-flash')
+# Gemini model, built once per process and shared across sessions
+model = load_model()
 
 # Set up Streamlit page
 st.set_page_config(page_title='Gemini API-based chatbot', layout='centered')
@@ -35,12 +31,8 @@ def get_gemini_response(question):
 
 # Display chat history
 st.subheader('Chat History:')
-# Using markdown for better formatting of chat messages
-for role, text in st.session_state['chat_history']:
-    if role == 'You':
-        st.markdown(f"**You:** {text}")
-    else:
-        st.markdown(f"**Bot:** {text}")
+# Only the most recent messages are drawn; older ones are paged
+render_history(st.session_state['chat_history'], bot_label='Bot')
 
 # Input field and submit button
 col1, col2 = st.columns([4, 1])
@@ -61,14 +53,10 @@ if submit_button and user_input:
     with st.spinner("Thinking..."):
         response_chunks = get_gemini_response(user_input)
         if response_chunks:
-            full_response = ""
             # Display response as it streams
             st.subheader('Response:')
             response_placeholder = st.empty() # Placeholder to update streamed response
-            for chunk in response_chunks:
-                full_response += chunk.text
-                response_placeholder.markdown(full_response + "▌") # Add a blinking cursor effect
-            response_placeholder.markdown(full_response) # Final display without cursor
+            full_response = render_stream(response_chunks, response_placeholder)
 
             st.session_state['chat_history'].append(('Bot', full_response))
             # Rerun to update chat history display
@@ -0,0 +1,79 @@
+import time
+
+import streamlit as st
+
+from model_backend import create_model
+
+# Messages shown in full on every rerun; everything older is paged
+RECENT_WINDOW = 20
+PAGE_SIZE = 50
+
+# Minimum seconds between placeholder updates while a reply streams in (~20 fps)
+STREAM_FRAME_INTERVAL = 0.05
+
+
+@st.cache_resource
+def load_model():
+    """Build the Gemini (or fake, see MODEL_BACKEND) model once per process."""
+    return create_model()
+
+
+@st.cache_resource
+def load_prompt_template(path='prompt_template.txt'):
+    """Read the persona prompt template once per process."""
+    with open(path, 'r') as file:
+        return file.read().strip()
+
+
+def _render_block(chat_history, start, stop, bot_label, newest_first):
+    indices = range(stop - 1, start - 1, -1) if newest_first else range(start, stop)
+    # One markdown element per message, so an unclosed code fence or list in
+    # one reply can't change how the following messages render
+    with st.container():
+        for i in indices:
+            role, text = chat_history[i]
+            st.markdown(f"**{'You' if role == 'You' else bot_label}:** {text}")
+
+
+def render_history(chat_history, bot_label, newest_first=False, window=RECENT_WINDOW, page_size=PAGE_SIZE):
+    """Render chat history at a cost that doesn't grow with conversation length.
+
+    The latest `window` messages are shown directly; older ones sit in a
+    collapsed expander that renders a single page of `page_size` at a time.
+    """
+    split = max(0, len(chat_history) - window)
+
+    def render_older():
+        if not split:
+            return
+        with st.expander(f"Earlier messages ({split})"):
+            pages = -(-split // page_size)
+            page = st.number_input("Page", min_value=1, max_value=pages, value=pages, key='history_page')
+            start = (page - 1) * page_size
+            _render_block(chat_history, start, min(start + page_size, split), bot_label, newest_first)
+
+    if not newest_first:
+        render_older()
+    _render_block(chat_history, split, len(chat_history), bot_label, newest_first)
+    if newest_first:
+        render_older()
+
+
+def render_stream(response_chunks, placeholder, interval=STREAM_FRAME_INTERVAL, cursor="▌"):
+    """Stream a Gemini response into placeholder and return the full reply text.
+
+    Chunks are collected in a list rather than concatenated, and the
+    placeholder is redrawn at most once per `interval` seconds, so the number
+    of browser updates depends on elapsed time instead of chunk count.
+    """
+    parts = []
+    last_frame = 0.0
+    for chunk in response_chunks:
+        parts.append(chunk.text)
+        now = time.monotonic()
+        if now - last_frame >= interval:
+            placeholder.markdown("".join(parts) + cursor)
+            last_frame = now
+    full_response = "".join(parts)
+    placeholder.markdown(full_response)  # Final display without cursor
+    return full_response
@@ -0,0 +1,107 @@
+"""Asyncio load generator for the /chat API.
+
+Drives main.app in-process through httpx's ASGI transport, so no server or
+Gemini key is needed. The fake model backend is selected automatically, and
+the upstream rate limit is lifted (unless UPSTREAM_RATE_LIMIT/UPSTREAM_BURST
+are set) so the app is measured rather than the token bucket.
+
+    python loadtest.py --sessions 200 --turns 5 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import tracemalloc
+import uuid
+
+os.environ.setdefault("MODEL_BACKEND", "fake")
+os.environ.setdefault("PROGRAM_API_KEY", "loadtest-key")
+os.environ.setdefault("UPSTREAM_RATE_LIMIT", "100000")
+os.environ.setdefault("UPSTREAM_BURST", "100000")
+
+import httpx
+
+QUESTIONS = [
+    "Who are you?",
+    "What did you discover?",
+    "What was your childhood like?",
+    "What advice would you give a young student?",
+    "What are you most proud of?"
+]
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_session(client, headers, persona, turns, semaphore, latencies, errors):
+    session_id = str(uuid.uuid4())
+    for _ in range(turns):
+        payload = {"session_id": session_id, "persona": persona, "message": random.choice(QUESTIONS)}
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/chat", json=payload, headers=headers)
+            elapsed = time.perf_counter() - start
+        if response.status_code == 200:
+            latencies.append(elapsed)
+        else:
+            errors[response.status_code] = errors.get(response.status_code, 0) + 1
+
+
+async def run_load(sessions, turns, concurrency):
+    import main
+
+    headers = {"Authorization": f"Bearer {main.PROGRAM_API_KEY}"}
+    personas = list(main.persona_options)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = {}
+
+    tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0]
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            run_session(client, headers, personas[i % len(personas)], turns, semaphore, latencies, errors)
+            for i in range(sessions)
+        ])
+        wall_time = time.perf_counter() - start
+    memory_after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "requests": len(latencies) + sum(errors.values()),
+        "errors": errors,
+        "wall_time_s": wall_time,
+        "throughput_rps": len(latencies) / wall_time if wall_time else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "memory_per_session_kb": (memory_after - memory_before) / max(1, sessions) / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test /chat against the fake model backend.")
+    parser.add_argument("--sessions", type=int, default=100, help="number of concurrent chat sessions")
+    parser.add_argument("--turns", type=int, default=3, help="messages sent per session")
+    parser.add_argument("--concurrency", type=int, default=50, help="max in-flight requests")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args.sessions, args.turns, args.concurrency))
+    print(f"Requests:        {report['requests']} ({report['errors'] or 'no'} errors)")
+    print(f"Wall time:       {report['wall_time_s']:.2f} s")
+    print(f"Throughput:      {report['throughput_rps']:.1f} req/s")
+    print(f"Latency p50/p95/p99: {report['p50_ms']:.1f} / {report['p95_ms']:.1f} / {report['p99_ms']:.1f} ms")
+    print(f"Memory/session:  {report['memory_per_session_kb']:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
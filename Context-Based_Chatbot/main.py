@@ -1,23 +1,82 @@
 from fastapi import FastAPI, Request, Header, HTTPException, Response
-from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-import google.generativeai as genai
+from typing import List, Optional
+import asyncio
+import json
+import math
 import os
+import sys
+import threading
 import uuid
 from dotenv import load_dotenv
+from metrics import Metrics, RequestTimer
+from model_backend import create_model
+from response_cache import ResponseCache
+from session_store import create_session_store
+
+# The upstream gateway and hedging are shared with the Joke Generator (see ../shared)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from shared.hedging import Hedger
+from shared.upstream_gateway import RETRYABLE_STATUSES, GatewayBusy, UpstreamGateway, upstream_status
 
 load_dotenv()
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
-model = genai.GenerativeModel('gemini-1.5-flash')
+# Gemini model, or a local fake when MODEL_BACKEND=fake (see model_backend.py).
+# Built on first use (or by the startup warm-up) so importing this module stays
+# cheap: google.generativeai alone takes most of a worker's startup time.
+model = None
+model_lock = threading.Lock()
+
+def get_model():
+    global model
+    if model is None:
+        with model_lock:
+            if model is None:
+                model = create_model()
+    return model
+
+# Session store: in-memory, SQLite or Redis depending on SESSION_BACKEND (see session_store.py)
+session_store = create_session_store()
 
-# In-memory session store
-chat_sessions = {}
+# Persona prompt template, read once at startup
+with open('prompt_template.txt', 'r') as file:
+    prompt_template = file.read().strip()
 
 # Custom app-level API key
 PROGRAM_API_KEY = os.getenv("PROGRAM_API_KEY")
 
+# Latency histograms, error and token counters served on /metrics
+metrics = Metrics(overhead_budget_ms=float(os.getenv("METRICS_OVERHEAD_BUDGET_MS", "0.5")))
+
+# Rate limiting, bounded queueing and 429/5xx retries for every Gemini call
+gateway = UpstreamGateway(
+    rate_per_second=float(os.getenv("UPSTREAM_RATE_LIMIT", "5")),
+    burst=int(os.getenv("UPSTREAM_BURST", "10")),
+    max_queue=int(os.getenv("UPSTREAM_MAX_QUEUE", "50")),
+    max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES", "3"))
+)
+
+# Opt-in hedging of idempotent calls (first turns) against Gemini's latency tail
+hedger = None
+if os.getenv("HEDGE_ENABLED", "false").lower() == "true":
+    hedger = Hedger(
+        percentile=float(os.getenv("HEDGE_PERCENTILE", "95")),
+        window=int(os.getenv("HEDGE_WINDOW", "200")),
+        max_ratio=float(os.getenv("HEDGE_MAX_RATIO", "0.05")),
+        min_samples=int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    )
+
+# Opt-in cache for first-turn replies, keyed by persona + normalized message
+response_cache = None
+if os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true":
+    response_cache = ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "512")),
+        ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL", "600"))
+    )
+
 # Available personas
 persona_options = {
     "Isaac Newton": "Mathematician and physicist",
@@ -27,8 +86,31 @@ persona_options = {
     "Alan Turing": "Father of computer science"
 }
 
+@asynccontextmanager
+async def lifespan(app):
+    # Optionally pay the model import/construction cost before taking traffic
+    if os.getenv("WARM_UP_ON_STARTUP", "false").lower() == "true":
+        await run_in_threadpool(get_model)
+    yield
+
 # FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+def build_prompt(persona, message):
+    """Format the persona instruction and append the user's message."""
+    persona_instruction = prompt_template.format(
+        persona_name=persona,
+        persona_description=persona_options[persona]
+    )
+    return persona_instruction + "\n\nUser: " + message
+
+def start_gemini_chat(persona, chat_history):
+    """Rebuild a Gemini chat session from stored history so any worker can serve the session."""
+    history = []
+    for (_, message), (_, reply) in zip(chat_history[0::2], chat_history[1::2]):
+        history.append({"role": "user", "parts": [build_prompt(persona, message)]})
+        history.append({"role": "model", "parts": [reply]})
+    return get_model().start_chat(history=history)
 
 # JSON request schema
 class ChatRequest(BaseModel):
@@ -36,59 +118,145 @@ class ChatRequest(BaseModel):
     persona: str
     message: str
 
+class PanelRequest(BaseModel):
+    session_id: str
+    message: str
+    personas: Optional[List[str]] = None  # Defaults to every persona
+
 @app.post("/chat")
 async def chat(req: Request, data: ChatRequest, authorization: str = Header(None)):
-    session_id = data.session_id  # Get session ID from the request body
-    
-    # 1. Validate API key
+    timer = RequestTimer(data.session_id)
+    status = 500
+    try:
+        response = await handle_chat(data, authorization, timer)
+        status = response.status_code
+        return response
+    except HTTPException as e:
+        status = e.status_code
+        raise
+    finally:
+        metrics.observe_request(timer, status)
+
+def check_api_key(authorization):
+    """Raise 401/403 unless the Authorization header carries PROGRAM_API_KEY."""
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Missing or invalid Authorization header.")
-    
+
     token = authorization.split(" ")[1]
     if token != PROGRAM_API_KEY:
         raise HTTPException(status_code=403, detail="Unauthorized API key.")
-    
-    # 2. Validate persona
-    if data.persona not in persona_options:
-        raise HTTPException(status_code=400, detail="Invalid persona.")
-    
-    # 3. Handle session state (chat history and persona)
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = {
-            "persona": data.persona,
-            "chat_history": [],
-            "gemini_chat_session": model.start_chat(history=[])
-        }
-    
-    # Update persona if changed
-    if chat_sessions[session_id]["persona"] != data.persona:
-        chat_sessions[session_id]["persona"] = data.persona
-        chat_sessions[session_id]["chat_history"] = []  # Reset chat history
-        chat_sessions[session_id]["gemini_chat_session"] = model.start_chat(history=[])
-
-    print(f"Session ID: {session_id}")
-    print(f"Chat History: {chat_sessions[session_id]['chat_history']}")
-    print(f"Persona: {chat_sessions[session_id]['persona']}")
-    
-    # 4. Build the prompt
-    with open('prompt_template.txt', 'r') as file:
-        prompt_template = file.read().strip()
-
-    # Format the prompt with persona details
-    persona_instruction = prompt_template.format(
-        persona_name=data.persona,
-        persona_description=persona_options[data.persona]
-    )
-    prompt = persona_instruction + "\n\nUser: " + data.message
-    
-    try:
-        # Maintain chat history
-        response = chat_sessions[session_id]["gemini_chat_session"].send_message(prompt)
-        chat_sessions[session_id]["chat_history"].append(("User", data.message))
-        chat_sessions[session_id]["chat_history"].append((data.persona, response.text))
-        
-        return JSONResponse(content={"response": response.text})
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error: {e}")
+
+async def handle_chat(data, authorization, timer):
+    with timer.span("auth"):
+        # 1. Validate API key
+        check_api_key(authorization)
+
+        # 2. Validate persona
+        if data.persona not in persona_options:
+            raise HTTPException(status_code=400, detail="Invalid persona.")
+
+    reply = await ask_persona(data.session_id, data.persona, data.message, timer)
+
+    with timer.span("serialization"):
+        return JSONResponse(content={"response": reply})
+
+async def ask_persona(session_id, persona, message, timer):
+    """Send message to persona within the stored session and return the reply text."""
+    with timer.span("session_lookup"):
+        # 3. Load session state (chat history and persona); stores may block on I/O
+        session = await run_in_threadpool(session_store.load, session_id)
+
+        # Start a fresh conversation for new sessions or when the persona changed
+        if session is None or session["persona"] != persona:
+            session = {"persona": persona, "chat_history": []}
+
+    with timer.span("prompt_build"):
+        # 4. Build the prompt
+        prompt = build_prompt(persona, message)
+        is_first_turn = not session["chat_history"]
+
+    async def attempt():
+        # Each attempt gets its own Gemini chat session, so a hedge never shares state
+        gemini_chat_session = start_gemini_chat(persona, session["chat_history"])
+        return await run_in_threadpool(gemini_chat_session.send_message, prompt)
+
+    async def fetch_reply():
+        if model is None:
+            # The first request builds the model (importing google.generativeai); keep that off the event loop
+            await run_in_threadpool(get_model)
+        # Only first turns are idempotent enough to send twice
+        response = await gateway.call_async(attempt, hedger=hedger if is_first_turn else None)
+        metrics.record_tokens(persona, getattr(response, "usage_metadata", None))
+        return response.text
+
+    with timer.span("upstream"):
+        try:
+            if response_cache is not None and is_first_turn:
+                reply, _ = await response_cache.get_or_fetch(
+                    response_cache.key(persona, message), fetch_reply
+                )
+            else:
+                reply = await fetch_reply()
+        except GatewayBusy as e:
+            raise HTTPException(status_code=503, detail="Upstream is busy, please retry later.",
+                                headers={"Retry-After": str(math.ceil(e.retry_after))})
+        except Exception as e:
+            metrics.record_upstream_error(e)
+            status, retry_after = upstream_status(e)
+            if status in RETRYABLE_STATUSES:
+                # Still overloaded after our own retries: tell the client to back off
+                raise HTTPException(status_code=503, detail=f"Error: {e}",
+                                    headers={"Retry-After": str(math.ceil(retry_after or 1))})
+            raise HTTPException(status_code=500, detail=f"Error: {e}")
+
+    with timer.span("session_save"):
+        # Maintain chat history: appended atomically so overlapping turns on
+        # the same session (from any worker) are all kept
+        await run_in_threadpool(session_store.append_turn, session_id, persona, message, reply)
+
+    return reply
+
+@app.post("/panel")
+async def panel(data: PanelRequest, authorization: str = Header(None)):
+    """Ask several personas the same question concurrently.
+
+    Each persona keeps its own history under the panel session. Answers are
+    streamed as NDJSON lines in the order they finish.
+    """
+    check_api_key(authorization)
+
+    personas = list(dict.fromkeys(data.personas or persona_options))
+    invalid = [persona for persona in personas if persona not in persona_options]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid persona: {', '.join(invalid)}.")
+
+    async def answer(persona):
+        session_id = f"panel:{data.session_id}:{persona}"
+        timer = RequestTimer(session_id)
+        status = 500
+        try:
+            reply = await ask_persona(session_id, persona, data.message, timer)
+            status = 200
+            return {"persona": persona, "response": reply}
+        except HTTPException as e:
+            status = e.status_code
+            return {"persona": persona, "error": e.detail}
+        finally:
+            # Each persona's answer is recorded like a /chat request
+            metrics.observe_request(timer, status)
+
+    async def stream_answers():
+        for next_answer in asyncio.as_completed([answer(persona) for persona in personas]):
+            yield json.dumps(await next_answer) + "\n"
+
+    return StreamingResponse(stream_answers(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+async def get_metrics():
+    gateway_lines = gateway.render_metrics("chat_upstream_gateway")
+    if hedger is not None:
+        gateway_lines += hedger.render_metrics("chat_hedging")
+    stored_sessions = await run_in_threadpool(session_store.count)
+    return PlainTextResponse(metrics.render(stored_sessions=stored_sessions) + "\n".join(gateway_lines) + "\n")
 
 # uvicorn main:app --reload
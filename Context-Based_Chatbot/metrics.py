@@ -0,0 +1,130 @@
+import json
+import logging
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond spans up to slow upstream calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+timing_logger = logging.getLogger("chatbot.timing")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def render(self, name, labels=""):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{"," if labels else ""}le="{bound}"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.total}")
+        lines.append(f"{name}_count{suffix} {self.count}")
+        return lines
+
+
+class Metrics:
+    """Process-wide metrics for /chat and /panel, rendered by the /metrics endpoint.
+
+    Only ever updated from the event loop thread, so plain dicts are enough.
+    """
+
+    def __init__(self, overhead_budget_ms=0.5):
+        self.overhead_budget = overhead_budget_ms / 1000
+        self.request_latency = Histogram()
+        self.span_latency = {}  # span name -> Histogram
+        self.instrumentation_overhead = Histogram()
+        self.over_budget = 0
+        self.responses = {}  # HTTP status -> count
+        self.upstream_errors = {}  # error code or type -> count
+        self.tokens = {}  # (persona, "prompt" | "response") -> count
+
+    def observe_request(self, timer, status):
+        start = time.perf_counter()
+        self.request_latency.observe(timer.elapsed())
+        for name, seconds in timer.spans.items():
+            self.span_latency.setdefault(name, Histogram()).observe(seconds)
+        self.responses[status] = self.responses.get(status, 0) + 1
+        if timing_logger.isEnabledFor(logging.INFO):
+            timing_logger.info(json.dumps({
+                "session_id": timer.session_id,
+                "status": status,
+                "total_ms": round(timer.elapsed() * 1000, 3),
+                "spans_ms": {name: round(seconds * 1000, 3) for name, seconds in timer.spans.items()}
+            }))
+        overhead = timer.overhead + time.perf_counter() - start
+        self.instrumentation_overhead.observe(overhead)
+        if overhead > self.overhead_budget:
+            self.over_budget += 1
+
+    def record_upstream_error(self, error):
+        code = str(getattr(error, "code", None) or type(error).__name__)
+        self.upstream_errors[code] = self.upstream_errors.get(code, 0) + 1
+
+    def record_tokens(self, persona, usage):
+        """Add a response's usage_metadata token counts to the persona's totals."""
+        if usage is None:
+            return
+        for kind, count in (("prompt", usage.prompt_token_count), ("response", usage.candidates_token_count)):
+            self.tokens[(persona, kind)] = self.tokens.get((persona, kind), 0) + (count or 0)
+
+    def render(self, stored_sessions):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = ["# TYPE chat_request_seconds histogram"]
+        lines += self.request_latency.render("chat_request_seconds")
+        lines.append("# TYPE chat_span_seconds histogram")
+        for name, histogram in self.span_latency.items():
+            lines += histogram.render("chat_span_seconds", f'span="{name}"')
+        lines.append("# TYPE chat_instrumentation_seconds histogram")
+        lines += self.instrumentation_overhead.render("chat_instrumentation_seconds")
+        lines.append("# TYPE chat_instrumentation_over_budget_total counter")
+        lines.append(f"chat_instrumentation_over_budget_total {self.over_budget}")
+        lines.append("# TYPE chat_responses_total counter")
+        for status, count in self.responses.items():
+            lines.append(f'chat_responses_total{{status="{status}"}} {count}')
+        lines.append("# TYPE chat_upstream_errors_total counter")
+        for code, count in self.upstream_errors.items():
+            lines.append(f'chat_upstream_errors_total{{code="{code}"}} {count}')
+        # Unexpired sessions in the store; each /panel persona keeps a session of its own
+        lines.append("# TYPE chat_stored_sessions gauge")
+        lines.append(f"chat_stored_sessions {stored_sessions}")
+        lines.append("# TYPE chat_tokens_total counter")
+        for (persona, kind), count in self.tokens.items():
+            lines.append(f'chat_tokens_total{{persona="{persona}",kind="{kind}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimer:
+    """Collects named timing spans for one request."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.start = time.perf_counter()
+        self.spans = {}
+        self.overhead = 0.0  # Time spent inside span bookkeeping itself
+
+    @contextmanager
+    def span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.spans[name] = self.spans.get(name, 0.0) + end - start
+            self.overhead += time.perf_counter() - end
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
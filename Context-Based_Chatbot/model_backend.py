@@ -0,0 +1,110 @@
+import os
+import random
+import time
+from types import SimpleNamespace
+
+
+class FakeUpstreamError(Exception):
+    """Error raised by the fake backend; `code` mimics the HTTP status Gemini would return."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+class FakeResponse:
+    def __init__(self, text, prompt=""):
+        self.text = text
+        # Rough 4-characters-per-token estimate, shaped like Gemini's usage_metadata
+        self.usage_metadata = SimpleNamespace(
+            prompt_token_count=len(prompt) // 4,
+            candidates_token_count=len(text) // 4
+        )
+
+
+class FakeChatSession:
+    """Stand-in for Gemini's ChatSession: same send_message/history surface, canned replies."""
+
+    def __init__(self, backend, history=None):
+        self.backend = backend
+        self.history = list(history or [])
+
+    def send_message(self, prompt, stream=False):
+        self.backend.maybe_fail()
+        reply = self.backend.reply_for(prompt, len(self.history) // 2)
+        self.history.append({"role": "user", "parts": [prompt]})
+        self.history.append({"role": "model", "parts": [reply]})
+        if stream:
+            return self.backend.stream_chunks(reply)
+        time.sleep(self.backend.sample_latency())
+        return FakeResponse(reply, prompt)
+
+
+class FakeModel:
+    """Local fake of genai.GenerativeModel for load tests; never touches the network.
+
+    latency_dist is one of "constant", "uniform", "lognormal" or "pareto" and is
+    scaled so its median is roughly latency_ms.
+    """
+
+    def __init__(self, latency_ms=300.0, latency_dist="lognormal", error_rate=0.0,
+                 chunk_count=8, chunk_interval_ms=40.0, seed=None):
+        self.latency_ms = latency_ms
+        self.latency_dist = latency_dist
+        self.error_rate = error_rate
+        self.chunk_count = chunk_count
+        self.chunk_interval_ms = chunk_interval_ms
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    def start_chat(self, history=None):
+        return FakeChatSession(self, history)
+
+    def sample_latency(self):
+        """Return one simulated upstream latency in seconds."""
+        median = self.latency_ms / 1000
+        if self.latency_dist == "constant":
+            return median
+        if self.latency_dist == "uniform":
+            return self.rng.uniform(0, 2 * median)
+        if self.latency_dist == "pareto":
+            # alpha=1.5 gives a heavy tail; the median of paretovariate(a) is 2**(1/a)
+            return median * self.rng.paretovariate(1.5) / 2 ** (1 / 1.5)
+        return median * self.rng.lognormvariate(0, 0.5)
+
+    def maybe_fail(self):
+        self.calls += 1
+        if self.rng.random() < self.error_rate:
+            code = self.rng.choice([429, 500, 503])
+            raise FakeUpstreamError(code, f"Fake upstream error {code}")
+
+    def reply_for(self, prompt, turn):
+        user_line = prompt.rsplit("User: ", 1)[-1]
+        return f"(fake reply #{turn + 1}) You said: {user_line}"
+
+    def stream_chunks(self, reply):
+        """Yield the reply in chunk_count pieces, spaced chunk_interval_ms apart."""
+        time.sleep(self.sample_latency())
+        size = max(1, -(-len(reply) // self.chunk_count))
+        for start in range(0, len(reply), size):
+            if start:
+                time.sleep(self.chunk_interval_ms / 1000)
+            yield FakeResponse(reply[start:start + size])
+
+
+def create_model():
+    """Build the chat model selected by MODEL_BACKEND ("gemini" or "fake")."""
+    if os.getenv("MODEL_BACKEND", "gemini").lower() == "fake":
+        return FakeModel(
+            latency_ms=float(os.getenv("FAKE_LATENCY_MS", "300")),
+            latency_dist=os.getenv("FAKE_LATENCY_DIST", "lognormal"),
+            error_rate=float(os.getenv("FAKE_ERROR_RATE", "0")),
+            chunk_count=int(os.getenv("FAKE_CHUNK_COUNT", "8")),
+            chunk_interval_ms=float(os.getenv("FAKE_CHUNK_INTERVAL_MS", "40"))
+        )
+
+    import google.generativeai as genai
+
+    # Configure Gemini API
+    genai.configure(api_key=os.getenv('GOOGLE_API_KEY'))
+    return genai.GenerativeModel('gemini-1.5-flash')
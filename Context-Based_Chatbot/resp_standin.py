@@ -0,0 +1,120 @@
+"""Tiny in-memory server speaking enough of the Redis protocol for RedisSessionStore.
+
+Supports PING, SELECT, GET, SET (with EX), DEL, DBSIZE, SCAN and WATCH/MULTI/EXEC
+transactions. Meant for local
+multi-worker runs and benchmarks, not production.
+
+    python resp_standin.py --port 6379
+"""
+import argparse
+import fnmatch
+import socketserver
+import threading
+import time
+
+store = {}  # key -> (value, expires_at or None)
+versions = {}  # key -> write count, checked by EXEC against WATCH
+store_lock = threading.RLock()
+
+
+def _get_live(key):
+    entry = store.get(key)
+    if entry is None:
+        return None
+    value, expires_at = entry
+    if expires_at is not None and expires_at <= time.monotonic():
+        del store[key]
+        return None
+    return value
+
+
+def execute(args):
+    """Run one command and return its RESP-encoded reply."""
+    command = args[0].upper()
+    with store_lock:
+        if command == b"PING":
+            return b"+PONG\r\n"
+        if command == b"SELECT":
+            return b"+OK\r\n"
+        if command == b"GET":
+            value = _get_live(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if command == b"SET":
+            expires_at = None
+            if len(args) >= 5 and args[3].upper() == b"EX":
+                expires_at = time.monotonic() + int(args[4])
+            store[args[1]] = (args[2], expires_at)
+            versions[args[1]] = versions.get(args[1], 0) + 1
+            return b"+OK\r\n"
+        if command == b"DEL":
+            removed = sum(1 for key in args[1:] if store.pop(key, None) is not None)
+            for key in args[1:]:
+                versions[key] = versions.get(key, 0) + 1
+            return b":%d\r\n" % removed
+        if command == b"SCAN":
+            # Whole keyspace in one page (cursor 0); only MATCH is honoured
+            pattern = args[args.index(b"MATCH") + 1] if b"MATCH" in args else b"*"
+            keys = [key for key in list(store) if fnmatch.fnmatchcase(key, pattern) and _get_live(key) is not None]
+            return b"*2\r\n$1\r\n0\r\n*%d\r\n" % len(keys) + b"".join(b"$%d\r\n%s\r\n" % (len(key), key) for key in keys)
+        if command == b"DBSIZE":
+            return b":%d\r\n" % sum(1 for key in list(store) if _get_live(key) is not None)
+    return b"-ERR unknown command '%s'\r\n" % command
+
+
+class RESPHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        watched = {}  # key -> version seen at WATCH
+        queued = None  # commands queued since MULTI
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            args = []
+            for _ in range(int(line[1:-2])):
+                length = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(length + 2)[:-2])
+            command = args[0].upper()
+            if command == b"WATCH":
+                with store_lock:
+                    watched.update((key, versions.get(key, 0)) for key in args[1:])
+                reply = b"+OK\r\n"
+            elif command == b"MULTI":
+                queued = []
+                reply = b"+OK\r\n"
+            elif command == b"EXEC":
+                if queued is None:
+                    reply = b"-ERR EXEC without MULTI\r\n"
+                else:
+                    with store_lock:
+                        if any(versions.get(key, 0) != version for key, version in watched.items()):
+                            reply = b"*-1\r\n"
+                        else:
+                            reply = b"*%d\r\n" % len(queued) + b"".join(execute(queued_args) for queued_args in queued)
+                watched, queued = {}, None
+            elif queued is not None:
+                queued.append(args)
+                reply = b"+QUEUED\r\n"
+            else:
+                reply = execute(args)
+            self.wfile.write(reply)
+
+
+class RESPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def serve_in_background(host="127.0.0.1", port=0):
+    """Start a stand-in server on a daemon thread; returns the server (see server.server_address)."""
+    server = RESPServer((host, port), RESPHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local Redis-protocol stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+    print(f"RESP stand-in listening on {args.host}:{args.port}")
+    RESPServer((args.host, args.port), RESPHandler).serve_forever()
@@ -0,0 +1,89 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+def normalize_message(message):
+    """Collapse case and whitespace so trivially different phrasings share a cache key."""
+    return " ".join(message.casefold().split())
+
+
+class ResponseCache:
+    """Bounded, TTL-based cache for first-turn persona replies.
+
+    Concurrent misses for the same key are single-flighted: the first caller
+    runs the upstream fetch and everyone else awaits its result.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, reply)
+        self._inflight = {}  # key -> asyncio.Future shared by concurrent misses
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(persona, message):
+        return (persona, normalize_message(message))
+
+    def get(self, key):
+        """Return the cached reply for key, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, reply = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return reply
+
+    def put(self, key, reply):
+        """Store reply under key, evicting the least recently used entries."""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, reply)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_fetch(self, key, fetch):
+        """Return (reply, cached) for key, calling the coroutine function fetch on a miss.
+
+        `cached` is False only for the caller whose fetch produced the reply.
+        """
+        while True:
+            reply = self.get(key)
+            if reply is not None:
+                self.hits += 1
+                return reply, True
+
+            pending = self._inflight.get(key)
+            if pending is None:
+                break
+            try:
+                reply = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # This caller was cancelled, not the fetch it was waiting on
+                continue  # The leader was cancelled: retry, and one waiter fetches instead
+            self.hits += 1
+            return reply, True
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            reply = await fetch()
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Mark as retrieved so a lone caller doesn't log a warning
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        self.put(key, reply)
+        future.set_result(reply)
+        return reply, False
@@ -0,0 +1,270 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+# A stored session is {"persona": str, "chat_history": [(role, text), ...]}.
+# The Gemini chat session itself is never stored; each request rebuilds it from
+# the chat history, so any worker (or node) can pick up any session.
+
+
+def serialize_session(session):
+    return json.dumps({"persona": session["persona"], "chat_history": session["chat_history"]})
+
+
+def deserialize_session(payload):
+    session = json.loads(payload)
+    session["chat_history"] = [tuple(entry) for entry in session["chat_history"]]
+    return session
+
+
+def add_turn(session, persona, message, reply):
+    """Return session with one exchange appended, starting over if the persona changed."""
+    if session is None or session["persona"] != persona:
+        session = {"persona": persona, "chat_history": []}
+    return {"persona": persona, "chat_history": session["chat_history"] + [("User", message), (persona, reply)]}
+
+
+class MemorySessionStore:
+    """Process-local store. Only safe with a single uvicorn worker."""
+
+    def __init__(self):
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        return self.sessions.get(session_id)
+
+    def save(self, session_id, session):
+        self.sessions[session_id] = session
+
+    def append_turn(self, session_id, persona, message, reply):
+        with self._lock:
+            self.sessions[session_id] = add_turn(self.sessions.get(session_id), persona, message, reply)
+
+    def delete(self, session_id):
+        self.sessions.pop(session_id, None)
+
+    def count(self):
+        return len(self.sessions)
+
+
+class SQLiteSessionStore:
+    """Sessions in a local SQLite file in WAL mode, shared by all workers on one host.
+
+    Sessions expire ttl_seconds after their last write, like the Redis store;
+    expired rows are deleted at most once per purge_interval seconds.
+    """
+
+    def __init__(self, path="chat_sessions.db", ttl_seconds=86400, purge_interval=60):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self._next_purge = 0.0
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, payload TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _connection(self):
+        # sqlite3 connections can't be shared across threads, so keep one per thread
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _expired_before(self):
+        return time.time() - self.ttl_seconds
+
+    def load(self, session_id):
+        row = self._connection().execute(
+            "SELECT payload FROM sessions WHERE session_id = ? AND updated_at > ?",
+            (session_id, self._expired_before())
+        ).fetchone()
+        return deserialize_session(row[0]) if row else None
+
+    def save(self, session_id, session):
+        connection = self._connection()
+        now = time.time()
+        connection.execute(
+            "INSERT INTO sessions (session_id, payload, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET payload = excluded.payload, updated_at = excluded.updated_at",
+            (session_id, serialize_session(session), now)
+        )
+        if now >= self._next_purge:
+            # Keep the file from growing forever: drop sessions idle longer than the TTL
+            self._next_purge = now + self.purge_interval
+            connection.execute("DELETE FROM sessions WHERE updated_at <= ?", (self._expired_before(),))
+
+    def append_turn(self, session_id, persona, message, reply):
+        # Re-read and write under the database write lock so overlapping turns
+        # from other requests or workers are never overwritten
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            session = add_turn(self.load(session_id), persona, message, reply)
+            self.save(session_id, session)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def delete(self, session_id):
+        self._connection().execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def count(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM sessions WHERE updated_at > ?", (self._expired_before(),)
+        ).fetchone()[0]
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisSessionStore:
+    """Sessions in any server speaking the Redis protocol (RESP).
+
+    Talks RESP over a plain socket so no client library is required; point
+    SESSION_REDIS_URL at a real Redis or at resp_standin.py for local runs.
+    """
+
+    key_prefix = "chat_session:"
+
+    def __init__(self, url="redis://127.0.0.1:6379/0", ttl_seconds=86400):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ttl_seconds = int(ttl_seconds)
+        self._local = threading.local()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=5)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._local.sock = sock
+        self._local.reader = sock.makefile("rb")
+        if self.db:
+            self._send("SELECT", self.db)
+            self._read_reply()
+
+    def _send(self, *args):
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        self._local.sock.sendall(b"".join(parts))
+
+    def _read_reply(self):
+        line = self._local.reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by session store.")
+        kind, rest = line[:1], line[1:-2]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            return self._local.reader.read(length + 2)[:-2]
+        if kind == b"*":
+            length = int(rest)
+            if length < 0:
+                return None  # EXEC aborted by WATCH
+            return [self._read_reply() for _ in range(length)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+        self._local.sock = None
+
+    def _command(self, *args, reconnect=True):
+        # One connection per thread; reconnect once if the server dropped it,
+        # unless the caller needs the command on the same connection (transactions)
+        for attempt in range(2 if reconnect else 1):
+            if getattr(self._local, "sock", None) is None:
+                self._connect()
+            try:
+                self._send(*args)
+                return self._read_reply()
+            except (ConnectionError, OSError):
+                self._drop_connection()
+                if attempt or not reconnect:
+                    raise
+
+    def load(self, session_id):
+        payload = self._command("GET", self.key_prefix + session_id)
+        return deserialize_session(payload) if payload is not None else None
+
+    def save(self, session_id, session):
+        self._command("SET", self.key_prefix + session_id, serialize_session(session), "EX", self.ttl_seconds)
+
+    def append_turn(self, session_id, persona, message, reply):
+        # Optimistic transaction: EXEC is aborted if another writer touched the
+        # key after WATCH, in which case re-read and try again. WATCH and MULTI
+        # belong to the connection, so if it drops the whole transaction is
+        # restarted on a new one (once) rather than resending single commands.
+        key = self.key_prefix + session_id
+        reconnected = False
+        while True:
+            try:
+                if self._try_append(key, persona, message, reply):
+                    return
+            except (ConnectionError, OSError):
+                if reconnected:
+                    raise
+                reconnected = True
+
+    def _try_append(self, key, persona, message, reply):
+        """Run one WATCH/MULTI/EXEC attempt; return False if another writer got in first."""
+        self._command("WATCH", key, reconnect=False)
+        payload = self._command("GET", key, reconnect=False)
+        session = add_turn(deserialize_session(payload) if payload is not None else None,
+                           persona, message, reply)
+        self._command("MULTI", reconnect=False)
+        self._command("SET", key, serialize_session(session), "EX", self.ttl_seconds, reconnect=False)
+        return self._command("EXEC", reconnect=False) is not None
+
+    def delete(self, session_id):
+        self._command("DEL", self.key_prefix + session_id)
+
+    def count(self):
+        # Only our own keys: the database may hold other data too
+        total = 0
+        cursor = b"0"
+        while True:
+            cursor, keys = self._command("SCAN", cursor, "MATCH", self.key_prefix + "*", "COUNT", 1000)
+            total += len(keys)
+            if cursor == b"0":
+                return total
+
+
+def create_session_store():
+    """Build the session store selected by SESSION_BACKEND ("memory", "sqlite" or "redis")."""
+    backend = os.getenv("SESSION_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteSessionStore(
+            os.getenv("SESSION_SQLITE_PATH", "chat_sessions.db"),
+            ttl_seconds=int(os.getenv("SESSION_TTL", "86400"))
+        )
+    if backend == "redis":
+        return RedisSessionStore(
+            os.getenv("SESSION_REDIS_URL", "redis://127.0.0.1:6379/0"),
+            ttl_seconds=int(os.getenv("SESSION_TTL", "86400"))
+        )
+    return MemorySessionStore()
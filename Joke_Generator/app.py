@@ -1,11 +1,10 @@
 from flask import Flask, request, jsonify, render_template
-import requests
+import os
+from jokes import (RANDOM_JOKE_PROMPT, GatewayBusy, error_response, fetch_joke, fetch_topic_joke, get_upstream_client,
+                   random_jokes, render_metrics, warm_up)
 
 app = Flask(__name__)
 
-API_KEY = ''  # Replace with secure storage (e.g., .env)
-GEMINI_URL = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key=' + API_KEY
-
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -13,27 +12,30 @@ def index():
 @app.route('/generate-joke', methods=['POST'])
 def generate_joke():
     # Get topic from request, default to empty string
-    topic = request.json.get('topic', '')
-    # Construct prompt based on topic
-    prompt = f"Tell me a funny joke about {topic}." if topic else "Tell me a random funny joke."
-    data = {
-        "contents": [{"parts": [{"text": prompt}]}],
-        "generationConfig": {
-            "temperature": 1.0,  # Increase randomness
-            "maxOutputTokens": 200  # Limit response length
-        }
-    }
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return jsonify({'error': 'Request body must be a JSON object.'}), 400
+    topic = body.get('topic', '')
+
+    # Random jokes come straight from the prefetched buffer when it has one
+    if not topic and random_jokes is not None:
+        random_jokes.start()  # No-op once the refiller is running
+        joke = random_jokes.get()
+        if joke is not None:
+            return jsonify({'joke': joke})
+
     try:
-        response = requests.post(GEMINI_URL, json=data)
-        response.raise_for_status()
-        response_json = response.json()
-        print("API Response:", response_json)
-        joke = response_json['candidates'][0]['content']['parts'][0]['text']
+        joke = fetch_topic_joke(topic) if topic else fetch_joke(RANDOM_JOKE_PROMPT)
         return jsonify({'joke': joke})
-    except requests.exceptions.RequestException as e:
-        return jsonify({'error': f'API request failed: {str(e)}'}), 500
-    except (KeyError, IndexError) as e:
-        return jsonify({'error': f'Unexpected API response format: {str(e)}'}), 500
+    except (GatewayBusy, KeyError, IndexError, ValueError) + get_upstream_client().errors as e:
+        body, status, headers = error_response(e)
+        return jsonify(body), status, headers
+
+@app.route('/metrics')
+def metrics():
+    return render_metrics(), 200, {'Content-Type': 'text/plain'}
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    if os.getenv('WARM_UP_ON_STARTUP', 'false').lower() == 'true':
+        warm_up()
+    app.run(debug=True)
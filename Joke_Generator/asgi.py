@@ -0,0 +1,96 @@
+"""Production ASGI entry point for the Joke Generator.
+
+Serves the same routes and response shapes as app.py, but /generate-joke
+awaits Gemini over a pooled async HTTP client instead of blocking a thread,
+so one process can hold hundreds of jokes in flight.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000
+"""
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+
+from jokes import (GEMINI_URL, RANDOM_JOKE_PROMPT, GatewayBusy, error_response, gateway, hedger, joke_request,
+                   parse_joke, random_jokes, render_metrics, split_batch, topic_jokes, topic_prompt)
+from upstream_client import AsyncUpstreamClient
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'index.html')
+
+# One pooled async client shared by every in-flight request; built on first
+# use (or at startup warm-up) so importing this module doesn't import httpx
+upstream_client = None
+
+def get_upstream_client():
+    global upstream_client
+    if upstream_client is None:
+        upstream_client = AsyncUpstreamClient(
+            connect_timeout=float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3.05')),
+            read_timeout=float(os.getenv('UPSTREAM_READ_TIMEOUT', '30')),
+            pool_size=int(os.getenv('UPSTREAM_POOL_SIZE', '100')),
+            http2=os.getenv('UPSTREAM_HTTP2', 'false').lower() == 'true'
+        )
+    return upstream_client
+
+@asynccontextmanager
+async def lifespan(app):
+    if os.getenv('WARM_UP_ON_STARTUP', 'false').lower() == 'true':
+        get_upstream_client()
+        if random_jokes is not None:
+            random_jokes.start()
+    yield
+    if upstream_client is not None:
+        await upstream_client.close()
+
+app = FastAPI(lifespan=lifespan)
+
+async def fetch_joke(prompt, max_output_tokens=200):
+    """Ask Gemini for a joke (or jokes) and return the reply text."""
+    data = joke_request(prompt, max_output_tokens)
+    client = get_upstream_client()
+    response = await gateway.call_async(client.post_json, GEMINI_URL, data, hedger=hedger)
+    return parse_joke(response.json())
+
+async def fetch_topic_joke(topic):
+    """Return a joke about topic, from the per-topic buffer when batching is on."""
+    if topic_jokes is None:
+        return await fetch_joke(*topic_prompt(topic))
+
+    async def fetch_batch():
+        return split_batch(await fetch_joke(*topic_prompt(topic)))
+
+    return await topic_jokes.get_or_fetch_async(topic, fetch_batch)
+
+@app.get('/')
+async def index():
+    return FileResponse(INDEX_PATH)
+
+@app.post('/generate-joke')
+async def generate_joke(request: Request):
+    # Get topic from request, default to empty string
+    try:
+        body = await request.json()
+    except ValueError:  # Malformed JSON or bad encoding
+        body = None
+    if not isinstance(body, dict):
+        return JSONResponse({'error': 'Request body must be a JSON object.'}, status_code=400)
+    topic = body.get('topic', '')
+
+    # Random jokes come straight from the prefetched buffer when it has one
+    if not topic and random_jokes is not None:
+        random_jokes.start()  # No-op once the refiller is running
+        joke = random_jokes.get()
+        if joke is not None:
+            return JSONResponse({'joke': joke})
+
+    try:
+        joke = await fetch_topic_joke(topic) if topic else await fetch_joke(RANDOM_JOKE_PROMPT)
+        return JSONResponse({'joke': joke})
+    except (GatewayBusy, KeyError, IndexError, ValueError) + get_upstream_client().errors as e:
+        body, status, headers = error_response(e)
+        return JSONResponse(body, status_code=status, headers=headers)
+
+@app.get('/metrics')
+async def metrics():
+    return PlainTextResponse(render_metrics())
@@ -0,0 +1,51 @@
+"""Drive many concurrent /generate-joke requests through the ASGI app.
+
+Uses a local Gemini stand-in with fixed latency, so with true async serving
+the wall time for N concurrent jokes stays close to one upstream latency.
+
+    python bench_async_serving.py --concurrency 300 --latency-ms 500
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault('UPSTREAM_RATE_LIMIT', '100000')
+os.environ.setdefault('UPSTREAM_BURST', '100000')
+
+import httpx
+
+import gemini_standin
+
+
+async def run(concurrency):
+    import asgi
+
+    transport = httpx.ASGITransport(app=asgi.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=60) as client:
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post('/generate-joke', json={'topic': f'topic {i}'}) for i in range(concurrency)
+        ])
+        wall_time = time.perf_counter() - start
+    ok = sum(1 for response in responses if response.status_code == 200 and 'joke' in response.json())
+    return ok, wall_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent jokes on the ASGI app.")
+    parser.add_argument('--concurrency', type=int, default=300)
+    parser.add_argument('--latency-ms', type=float, default=500)
+    args = parser.parse_args()
+
+    server, url = gemini_standin.serve_in_background(latency_ms=args.latency_ms)
+    os.environ['GEMINI_URL'] = url
+    os.environ.setdefault('UPSTREAM_POOL_SIZE', str(args.concurrency))
+    ok, wall_time = asyncio.run(run(args.concurrency))
+    print(f"{ok}/{args.concurrency} jokes in {wall_time:.2f} s "
+          f"(upstream latency {args.latency_ms:.0f} ms, {ok / wall_time:.0f} jokes/s)")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Measure upstream calls and latency for popular topics with and without batching.
+
+Replays a skewed (Zipf-like) stream of topic requests through the Flask app
+against a local Gemini stand-in, once per batch size. With --concurrency above
+1 the requests are sent from that many threads, so misses on a hot topic overlap.
+
+    python bench_topic_batching.py --requests 300 --latency-ms 100 --concurrency 20
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault('UPSTREAM_RATE_LIMIT', '1000')
+os.environ.setdefault('UPSTREAM_BURST', '1000')
+
+import gemini_standin
+from joke_buffer import TopicJokeBuffer
+
+TOPICS = ["cats", "dogs", "programmers", "coffee", "math", "pirates", "space", "pizza", "teachers", "robots"]
+
+
+def run(app_module, jokes_module, batch_size, topics, concurrency):
+    jokes_module.TOPIC_JOKE_BATCH_SIZE = batch_size
+    jokes_module.topic_jokes = TopicJokeBuffer() if batch_size > 1 else None
+    seed_upstream_calls = gemini_standin.requests_served
+
+    def request(topic):
+        start = time.perf_counter()
+        app_module.app.test_client().post('/generate-joke', json={'topic': topic})
+        return (time.perf_counter() - start) * 1000
+
+    with ThreadPoolExecutor(concurrency) as executor:
+        latencies = list(executor.map(request, topics))
+    return gemini_standin.requests_served - seed_upstream_calls, statistics.median(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batched topic jokes.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 5, 10])
+    parser.add_argument("--concurrency", type=int, default=1, help="requests in flight at once")
+    args = parser.parse_args()
+
+    server, url = gemini_standin.serve_in_background(latency_ms=args.latency_ms)
+    os.environ['GEMINI_URL'] = url
+    import app
+    import jokes
+
+    rng = random.Random(42)
+    weights = [1 / rank for rank in range(1, len(TOPICS) + 1)]
+    topics = rng.choices(TOPICS, weights=weights, k=args.requests)
+    for batch_size in args.batch_sizes:
+        calls, p50 = run(app, jokes, batch_size, topics, args.concurrency)
+        print(f"batch size {batch_size:>2}: {calls:>4} upstream calls for {len(topics)} requests, p50 {p50:7.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
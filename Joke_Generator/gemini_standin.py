@@ -0,0 +1,68 @@
+"""Local stand-in for the Gemini generateContent endpoint.
+
+Answers POSTs with Gemini-shaped JSON after a configurable delay, over
+HTTP/1.1 keep-alive. Point the app at it with
+GEMINI_URL=http://127.0.0.1:8088/generate for local runs and benchmarks.
+
+    python gemini_standin.py --port 8088 --latency-ms 300
+"""
+import argparse
+import itertools
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+joke_counter = itertools.count(1)
+requests_served = 0  # Upstream calls seen, for benchmarks
+
+
+class GeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep connections open between requests
+    disable_nagle_algorithm = True  # Headers and body go out in separate writes
+    latency_ms = 0.0
+
+    def do_POST(self):
+        global requests_served
+        requests_served += 1
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        prompt = body.get("contents", [{}])[0].get("parts", [{}])[0].get("text", "")
+        time.sleep(self.latency_ms / 1000)
+        # Batched prompts ("Tell me 5 different ...") get that many jokes separated by ---
+        batch = re.match(r"Tell me (\d+) different", prompt)
+        count = int(batch.group(1)) if batch else 1
+        text = "\n---\n".join(f"Stand-in joke #{next(joke_counter)} for: {prompt}" for _ in range(count))
+        payload = json.dumps({"candidates": [{"content": {"parts": [{"text": text}]}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output readable
+
+
+class GeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512  # Accept bursts of concurrent connections from load tests
+
+
+def serve_in_background(host="127.0.0.1", port=0, latency_ms=0.0):
+    """Start a stand-in on a daemon thread and return (server, url)."""
+    handler = type("ConfiguredGeminiHandler", (GeminiHandler,), {"latency_ms": latency_ms})
+    server = GeminiServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/generate"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local Gemini stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    handler = type("ConfiguredGeminiHandler", (GeminiHandler,), {"latency_ms": args.latency_ms})
+    print(f"Gemini stand-in listening on http://{args.host}:{args.port}/generate")
+    GeminiServer((args.host, args.port), handler).serve_forever()
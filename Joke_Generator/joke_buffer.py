@@ -0,0 +1,294 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger('joke_generator')
+
+
+def normalize_joke(joke):
+    """Collapse case and whitespace so reworded-by-spacing repeats are caught."""
+    return " ".join(joke.casefold().split())
+
+
+class RandomJokeBuffer:
+    """Bounded buffer of pre-generated random jokes, topped up by a background thread.
+
+    The refiller wakes when the buffer drops below low_water and fills it back
+    to capacity. A joke is never handed out twice within the last
+    no_repeat_window jokes buffered. Duplicates are discarded; the refiller
+    waits duplicate_delay after each one and gives up on the pass after
+    max_duplicates, so a repetitive model can't eat the upstream budget.
+    Failed fetches back off exponentially from retry_delay up to
+    max_retry_delay, and a pass ends after max_errors failures in a row, so a
+    broken upstream (bad key, exhausted quota) isn't polled while idle.
+    """
+
+    def __init__(self, fetch, capacity=20, low_water=5, no_repeat_window=100, retry_delay=5.0,
+                 duplicate_delay=1.0, max_duplicates=10, max_errors=3, max_retry_delay=300.0):
+        self.fetch = fetch
+        self.capacity = capacity
+        self.low_water = low_water
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.max_errors = max_errors
+        self._error_streak = 0  # Consecutive failures, kept across passes for the backoff
+        self.duplicate_delay = duplicate_delay
+        self.max_duplicates = max_duplicates
+        self._jokes = deque()
+        self._recent = deque(maxlen=no_repeat_window)
+        self._recent_keys = set()
+        self._lock = threading.Lock()
+        self._wanted = threading.Event()
+        self._thread = None
+        self.hits = 0
+        self.misses = 0
+        self.duplicates = 0
+        self.refill_errors = 0
+        self.refills = 0
+        self.refill_seconds = 0.0
+
+    def start(self):
+        """Start the background refiller (idempotent and thread-safe)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='random-joke-refiller', daemon=True)
+        self._thread.start()
+        self._wanted.set()
+
+    def get(self):
+        """Pop a buffered joke, or return None if the buffer is empty."""
+        with self._lock:
+            if self._jokes:
+                joke = self._jokes.popleft()
+                self.hits += 1
+            else:
+                joke = None
+                self.misses += 1
+            if len(self._jokes) < self.low_water:
+                self._wanted.set()
+        return joke
+
+    def _remember(self, key):
+        if len(self._recent) == self._recent.maxlen:
+            self._recent_keys.discard(self._recent[0])
+        self._recent.append(key)
+        self._recent_keys.add(key)
+
+    def _run(self):
+        while True:
+            self._wanted.wait()
+            duplicates = 0
+            errors = 0
+            while len(self._jokes) < self.capacity and duplicates < self.max_duplicates and errors < self.max_errors:
+                start = time.perf_counter()
+                try:
+                    joke = self.fetch()
+                except Exception as e:
+                    logger.warning("Random joke refill failed: %s", e)
+                    with self._lock:
+                        self.refill_errors += 1
+                    errors += 1
+                    self._error_streak += 1
+                    time.sleep(min(self.max_retry_delay, self.retry_delay * 2 ** (self._error_streak - 1)))
+                    continue
+                self._error_streak = 0
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.refills += 1
+                    self.refill_seconds += elapsed
+                    key = normalize_joke(joke)
+                    duplicate = key in self._recent_keys
+                    if duplicate:
+                        self.duplicates += 1
+                    else:
+                        self._remember(key)
+                        self._jokes.append(joke)
+                if duplicate:
+                    duplicates += 1
+                    time.sleep(self.duplicate_delay)
+            self._wanted.clear()
+
+    def render_metrics(self, prefix):
+        """Return hit rate, buffer size and refill latency as Prometheus text lines."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            values = {
+                "size": ("gauge", len(self._jokes)),
+                "hits_total": ("counter", self.hits),
+                "misses_total": ("counter", self.misses),
+                "hit_ratio": ("gauge", self.hits / lookups if lookups else 0.0),
+                "duplicates_total": ("counter", self.duplicates),
+                "refill_errors_total": ("counter", self.refill_errors),
+                "refills_total": ("counter", self.refills),
+                "refill_seconds_total": ("counter", self.refill_seconds)
+            }
+        lines = []
+        for name, (kind, value) in values.items():
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name} {value}")
+        return lines
+
+
+def normalize_topic(topic):
+    # Clients may send non-string topics (numbers); the prompt f-string accepts them too
+    return " ".join(str(topic).casefold().split())
+
+
+def split_jokes(text, separator='---'):
+    """Split a multi-joke reply on separator lines and drop empty or repeated jokes."""
+    jokes = []
+    seen = set()
+    current = []
+    for line in text.splitlines() + [separator]:
+        if line.strip() == separator:
+            joke = "\n".join(current).strip()
+            current = []
+            if joke and normalize_joke(joke) not in seen:
+                seen.add(normalize_joke(joke))
+                jokes.append(joke)
+        else:
+            current.append(line)
+    return jokes
+
+
+class TopicJokeBuffer:
+    """Per-topic buffers of spare jokes left over from batched upstream calls.
+
+    Holds at most per_topic jokes for each of max_topics topics (least
+    recently used topics are dropped first); jokes expire after ttl_seconds.
+    Concurrent misses on the same topic are single-flighted: the first caller
+    fetches a batch and the others take their jokes from it.
+    """
+
+    def __init__(self, per_topic=10, max_topics=1000, ttl_seconds=3600):
+        self.per_topic = per_topic
+        self.max_topics = max_topics
+        self.ttl_seconds = ttl_seconds
+        self._topics = OrderedDict()  # normalized topic -> deque of (expires_at, joke)
+        self._inflight = {}  # normalized topic -> concurrent.futures.Future of the batch being fetched
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get(self, topic, count=True):
+        """Pop an unexpired joke for topic, or return None; count=False leaves hit/miss counts alone."""
+        key = normalize_topic(topic)
+        now = time.monotonic()
+        with self._lock:
+            jokes = self._topics.get(key)
+            while jokes:
+                expires_at, joke = jokes.popleft()
+                if expires_at > now:
+                    self._topics.move_to_end(key)
+                    if count:
+                        self.hits += 1
+                    return joke
+            self._topics.pop(key, None)
+            if count:
+                self.misses += 1
+            return None
+
+    def put(self, topic, jokes):
+        """Buffer spare jokes for topic, keeping the newest per_topic of them."""
+        if not jokes:
+            return
+        key = normalize_topic(topic)
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            buffered = self._topics.setdefault(key, deque(maxlen=self.per_topic))
+            buffered.extend((expires_at, joke) for joke in jokes)
+            self._topics.move_to_end(key)
+            while len(self._topics) > self.max_topics:
+                self._topics.popitem(last=False)
+
+    def _claim(self, key):
+        """Return (future, leader) for the batch fetch in flight for key, starting one if there is none."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._inflight[key] = concurrent.futures.Future()
+            return future, True
+
+    def _release(self, key, future, jokes=None, error=None):
+        """Buffer a fetched batch (or record its failure), wake waiting callers and return the first joke."""
+        if error is None:
+            self.put(key, jokes[1:])
+        with self._lock:
+            self._inflight.pop(key, None)
+        if error is None:
+            future.set_result(None)
+            return jokes[0]
+        if isinstance(error, Exception):
+            future.set_exception(error)
+        else:
+            future.cancel()  # Waiting callers retry and one of them fetches instead
+
+    def get_or_fetch(self, topic, fetch):
+        """Return a joke about topic, calling fetch() for a new batch (a non-empty list) on a miss."""
+        key = normalize_topic(topic)
+        first_lookup = True  # One hit or miss per request, however often it waits
+        while True:
+            joke = self.get(key, count=first_lookup)
+            first_lookup = False
+            if joke is not None:
+                return joke
+            future, leader = self._claim(key)
+            if not leader:
+                try:
+                    future.result()  # Re-raises the leader's error
+                except concurrent.futures.CancelledError:
+                    pass
+                continue  # Take a joke from the batch, or fetch the next one if it ran out
+            try:
+                jokes = fetch()
+            except BaseException as e:
+                self._release(key, future, error=e)
+                raise
+            return self._release(key, future, jokes)
+
+    async def get_or_fetch_async(self, topic, fetch):
+        """Coroutine counterpart of get_or_fetch for the ASGI server; fetch is a coroutine function."""
+        key = normalize_topic(topic)
+        first_lookup = True  # One hit or miss per request, however often it waits
+        while True:
+            joke = self.get(key, count=first_lookup)
+            first_lookup = False
+            if joke is not None:
+                return joke
+            future, leader = self._claim(key)
+            if not leader:
+                try:
+                    await asyncio.shield(asyncio.wrap_future(future))
+                except asyncio.CancelledError:
+                    if not future.cancelled():
+                        raise
+                continue
+            try:
+                jokes = await fetch()
+            except BaseException as e:
+                self._release(key, future, error=e)
+                raise
+            return self._release(key, future, jokes)
+
+    def render_metrics(self, prefix):
+        """Return hit counts and buffer sizes as Prometheus text lines."""
+        with self._lock:
+            values = {
+                "topics": ("gauge", len(self._topics)),
+                "jokes": ("gauge", sum(len(jokes) for jokes in self._topics.values())),
+                "hits_total": ("counter", self.hits),
+                "misses_total": ("counter", self.misses),
+                "coalesced_total": ("counter", self.coalesced)
+            }
+        lines = []
+        for name, (kind, value) in values.items():
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name} {value}")
+        return lines
@@ -0,0 +1,149 @@
+# Joke generation shared by the Flask app (app.py) and the ASGI server (asgi.py).
+# Kept free of web-framework imports so each server only loads its own.
+import logging
+import math
+import os
+import sys
+import threading
+from joke_buffer import RandomJokeBuffer, TopicJokeBuffer, split_jokes
+from upstream_client import UpstreamClient
+
+# The upstream gateway and hedging are shared with the chatbot API (see ../shared)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from shared.hedging import Hedger
+from shared.upstream_gateway import RETRYABLE_STATUSES, GatewayBusy, UpstreamGateway, upstream_status
+
+logger = logging.getLogger('joke_generator')
+
+API_KEY = ''  # Replace with secure storage (e.g., .env)
+GEMINI_URL = os.getenv('GEMINI_URL', 'https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent?key=' + API_KEY)
+
+# One pooled keep-alive client shared by all requests and threads, built on
+# first use. The ASGI server has its own async client, so it only builds this
+# one (and imports requests) when the random-joke refiller thread runs.
+upstream_client = None
+upstream_client_lock = threading.Lock()
+
+def get_upstream_client():
+    global upstream_client
+    if upstream_client is None:
+        with upstream_client_lock:
+            if upstream_client is None:
+                upstream_client = UpstreamClient(
+                    connect_timeout=float(os.getenv('UPSTREAM_CONNECT_TIMEOUT', '3.05')),
+                    read_timeout=float(os.getenv('UPSTREAM_READ_TIMEOUT', '30')),
+                    pool_size=int(os.getenv('UPSTREAM_POOL_SIZE', '20')),
+                    http2=os.getenv('UPSTREAM_HTTP2', 'false').lower() == 'true'
+                )
+    return upstream_client
+
+# Rate limiting, bounded queueing and 429/5xx retries for every Gemini call
+gateway = UpstreamGateway(
+    rate_per_second=float(os.getenv('UPSTREAM_RATE_LIMIT', '5')),
+    burst=int(os.getenv('UPSTREAM_BURST', '10')),
+    max_queue=int(os.getenv('UPSTREAM_MAX_QUEUE', '50')),
+    max_retries=int(os.getenv('UPSTREAM_MAX_RETRIES', '3'))
+)
+
+# Opt-in hedging: every joke request is idempotent, so slow calls may be sent twice
+hedger = None
+if os.getenv('HEDGE_ENABLED', 'false').lower() == 'true':
+    hedger = Hedger(
+        percentile=float(os.getenv('HEDGE_PERCENTILE', '95')),
+        window=int(os.getenv('HEDGE_WINDOW', '200')),
+        max_ratio=float(os.getenv('HEDGE_MAX_RATIO', '0.05')),
+        min_samples=int(os.getenv('HEDGE_MIN_SAMPLES', '20')),
+        max_workers=int(os.getenv('HEDGE_MAX_WORKERS', '64'))
+    )
+
+RANDOM_JOKE_PROMPT = "Tell me a random funny joke."
+
+def joke_request(prompt, max_output_tokens=200):
+    """Build the generateContent payload for prompt."""
+    return {
+        "contents": [{"parts": [{"text": prompt}]}],
+        "generationConfig": {
+            "temperature": 1.0,  # Increase randomness
+            "maxOutputTokens": max_output_tokens  # Limit response length
+        }
+    }
+
+def parse_joke(response_json):
+    logger.debug("API response: %s", response_json)
+    return response_json['candidates'][0]['content']['parts'][0]['text']
+
+def fetch_joke(prompt, max_output_tokens=200):
+    """Ask Gemini for a joke (or jokes) and return the reply text."""
+    data = joke_request(prompt, max_output_tokens)
+    client = get_upstream_client()
+    response = gateway.call(client.post_json, GEMINI_URL, data, hedger=hedger)
+    return parse_joke(response.json())
+
+# Opt-in buffer of pre-generated random jokes, refilled in the background
+random_jokes = None
+if os.getenv('RANDOM_JOKE_BUFFER_ENABLED', 'false').lower() == 'true':
+    random_jokes = RandomJokeBuffer(
+        lambda: fetch_joke(RANDOM_JOKE_PROMPT),
+        capacity=int(os.getenv('RANDOM_JOKE_BUFFER_SIZE', '20')),
+        low_water=int(os.getenv('RANDOM_JOKE_LOW_WATER', '5')),
+        no_repeat_window=int(os.getenv('RANDOM_JOKE_NO_REPEAT_WINDOW', '100')),
+        duplicate_delay=float(os.getenv('RANDOM_JOKE_DUPLICATE_DELAY', '1')),
+        max_duplicates=int(os.getenv('RANDOM_JOKE_MAX_DUPLICATES', '10'))
+    )
+
+# Opt-in batching: ask for several jokes per call and keep the extras per topic
+TOPIC_JOKE_BATCH_SIZE = int(os.getenv('TOPIC_JOKE_BATCH_SIZE', '1'))
+topic_jokes = None
+if TOPIC_JOKE_BATCH_SIZE > 1:
+    topic_jokes = TopicJokeBuffer(
+        per_topic=int(os.getenv('TOPIC_JOKE_BUFFER_SIZE', '10')),
+        max_topics=int(os.getenv('TOPIC_JOKE_MAX_TOPICS', '1000')),
+        ttl_seconds=float(os.getenv('TOPIC_JOKE_TTL', '3600'))
+    )
+
+def topic_prompt(topic):
+    """Return (prompt, maxOutputTokens) for a topic, asking for a batch when batching is on."""
+    if topic_jokes is None:
+        return f"Tell me a funny joke about {topic}.", 200
+    prompt = (f"Tell me {TOPIC_JOKE_BATCH_SIZE} different funny jokes about {topic}. "
+              "Separate the jokes with a line containing only ---.")
+    return prompt, 200 * TOPIC_JOKE_BATCH_SIZE
+
+def split_batch(reply):
+    """Split a batched reply into its jokes (the whole reply if it isn't split)."""
+    return split_jokes(reply) or [reply]
+
+def fetch_topic_joke(topic):
+    """Return a joke about topic, from the per-topic buffer when batching is on."""
+    if topic_jokes is None:
+        return fetch_joke(*topic_prompt(topic))
+    # Concurrent misses on a topic share one batch call instead of each paying for one
+    return topic_jokes.get_or_fetch(topic, lambda: split_batch(fetch_joke(*topic_prompt(topic))))
+
+def error_response(error):
+    """Map a failed joke request to (JSON body, HTTP status, headers)."""
+    if isinstance(error, GatewayBusy):
+        return {'error': 'Joke service is busy, please retry shortly.'}, 503, {'Retry-After': str(math.ceil(error.retry_after))}
+    if isinstance(error, (KeyError, IndexError, ValueError)):  # ValueError: reply wasn't JSON
+        return {'error': f'Unexpected API response format: {str(error)}'}, 500, {}
+    status, retry_after = upstream_status(error)
+    if status in RETRYABLE_STATUSES:
+        # Still overloaded after our own retries: tell the client to back off
+        return {'error': f'API request failed: {str(error)}'}, 503, {'Retry-After': str(math.ceil(retry_after or 1))}
+    return {'error': f'API request failed: {str(error)}'}, 500, {}
+
+def warm_up():
+    """Build the upstream client and start background refills ahead of the first request."""
+    get_upstream_client()
+    if random_jokes is not None:
+        random_jokes.start()
+
+def render_metrics():
+    lines = gateway.render_metrics('joke_upstream_gateway')
+    if random_jokes is not None:
+        lines += random_jokes.render_metrics('joke_random_buffer')
+    if topic_jokes is not None:
+        lines += topic_jokes.render_metrics('joke_topic_buffer')
+    if hedger is not None:
+        lines += hedger.render_metrics('joke_hedging')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,69 @@
+class UpstreamClient:
+    """Pooled, keep-alive HTTP client shared by every request and thread.
+
+    Uses a requests.Session with a sized connection pool by default. With
+    http2=True it switches to httpx (pip install "httpx[http2]"), which
+    multiplexes concurrent requests over one connection. Either way the
+    connect and read timeouts are separate, so a stalled upstream can't hold a
+    worker forever.
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=30.0, pool_size=20, http2=False):
+        self.http2 = http2
+        if http2:
+            import httpx
+
+            self.errors = (httpx.HTTPError,)
+            self._client = httpx.Client(
+                http2=True,
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            )
+        else:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            self.errors = (requests.exceptions.RequestException,)
+            self._timeout = (connect_timeout, read_timeout)
+            self._client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            self._client.mount('https://', adapter)
+            self._client.mount('http://', adapter)
+
+    def post_json(self, url, payload):
+        """POST payload as JSON and return the response, raising on HTTP errors."""
+        if self.http2:
+            response = self._client.post(url, json=payload)
+        else:
+            response = self._client.post(url, json=payload, timeout=self._timeout)
+        response.raise_for_status()
+        return response
+
+    def close(self):
+        self._client.close()
+
+
+class AsyncUpstreamClient:
+    """asyncio counterpart of UpstreamClient for the ASGI server, built on httpx.AsyncClient.
+
+    One instance is shared by every in-flight request; close it on shutdown.
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=30.0, pool_size=100, http2=False):
+        import httpx
+
+        self.errors = (httpx.HTTPError,)
+        self._client = httpx.AsyncClient(
+            http2=http2,
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        )
+
+    async def post_json(self, url, payload):
+        """POST payload as JSON and return the response, raising on HTTP errors."""
+        response = await self._client.post(url, json=payload)
+        response.raise_for_status()
+        return response
+
+    async def close(self):
+        await self._client.aclose()
@@ -0,0 +1,101 @@
+"""Report cold-start cost of each service: import time and time to first response.
+
+Every measurement runs in a fresh interpreter from the service's directory,
+the way uvicorn/flask start a worker. The first response goes to a cheap
+route (what a readiness probe hits), so it shows the startup cost paid
+before the worker can serve. For the chatbot API the cost of building the
+Gemini model (done lazily, or by WARM_UP_ON_STARTUP) is shown separately.
+
+    python bench_startup.py --runs 3
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Runs inside the child interpreter. Drives ASGI apps with a bare ASGI call so
+# the harness itself doesn't import an HTTP client the service might not need.
+PROBE = r'''
+import asyncio, json, sys, time
+
+async def asgi_get(app, path):
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+             "root_path": "", "headers": [], "client": ("127.0.0.1", 1), "server": ("127.0.0.1", 80)}
+    messages = []
+    requested = asyncio.Event()
+    async def receive():
+        if not requested.is_set():
+            requested.set()
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # The client never disconnects
+    async def send(message):
+        messages.append(message)
+    await app(scope, receive, send)
+    return messages[0]["status"]
+
+module_name, kind, path = sys.argv[1:4]
+start = time.perf_counter()
+module = __import__(module_name)
+imported = time.perf_counter()
+if kind == "flask":
+    status = module.app.test_client().get(path).status_code
+else:
+    status = asyncio.run(asgi_get(module.app, path))
+responded = time.perf_counter()
+
+model_build = None
+if hasattr(module, "get_model"):
+    module.get_model()
+    model_build = time.perf_counter() - responded
+elif hasattr(module, "model"):
+    model_build = 0.0  # Built during import
+
+print(json.dumps({"import": imported - start, "first_response": responded - start,
+                  "status": status, "model_build": model_build}))
+'''
+
+SERVICES = [
+    ("chatbot API (main:app)", "Context-Based_Chatbot", "main", "asgi", "/metrics"),
+    ("jokes Flask (app:app)", "Joke_Generator", "app", "flask", "/"),
+    ("jokes ASGI (asgi:app)", "Joke_Generator", "asgi", "asgi", "/"),
+    ("sudoku API (main:app)", "sudoku", "main", "asgi", "/"),
+]
+
+
+def measure(root, directory, module, kind, path):
+    env = dict(os.environ, GOOGLE_API_KEY=os.getenv("GOOGLE_API_KEY", "startup-bench"),
+               PROGRAM_API_KEY="startup-bench", PYTHONDONTWRITEBYTECODE="1")
+    cwd = os.path.join(root, directory)
+    if not os.path.exists(os.path.join(cwd, module + ".py")):
+        return None
+    output = subprocess.run([sys.executable, "-c", PROBE, module, kind, path], cwd=cwd, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark service cold starts.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--root", default=ROOT, help="repository checkout to measure")
+    args = parser.parse_args()
+
+    print(f"{'service':<24} {'import':>9} {'1st resp':>9} {'model build':>12}")
+    for name, directory, module, kind, path in SERVICES:
+        results = [measure(args.root, directory, module, kind, path) for _ in range(args.runs)]
+        if results[0] is None:
+            print(f"{name:<24} {'(not present)':>9}")
+            continue
+        imported = statistics.median(r["import"] for r in results) * 1000
+        first = statistics.median(r["first_response"] for r in results) * 1000
+        builds = [r["model_build"] for r in results if r["model_build"] is not None]
+        build = f"{statistics.median(builds) * 1000:9.0f} ms" if builds else f"{'-':>12}"
+        print(f"{name:<24} {imported:6.0f} ms {first:6.0f} ms {build}")
+
+
+if __name__ == "__main__":
+    main()
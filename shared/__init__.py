@@ -0,0 +1,5 @@
+"""Modules shared by the Gemini-backed services (chatbot API and Joke Generator).
+
+Each service runs from its own directory and puts the repository root on
+sys.path before importing from here.
+"""
@@ -0,0 +1,180 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+from collections import deque
+
+
+class Hedger:
+    """Hedged requests for idempotent upstream calls.
+
+    If a call hasn't answered within the given percentile of recent latency,
+    a second identical call is sent and whichever answers first wins. Hedges
+    are capped at max_ratio of all calls, and none are sent until min_samples
+    latencies have been seen. Works from asyncio (run) and threads (run_sync).
+    An optional admit() callable, such as UpstreamGateway.try_acquire, has the
+    final say on each hedge.
+    """
+
+    def __init__(self, percentile=95, window=200, max_ratio=0.05, min_samples=20, max_workers=32):
+        self.percentile = percentile
+        self.max_ratio = max_ratio
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._hedges_running = 0
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self):
+        """Seconds to wait before hedging, or None while there are too few samples."""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+
+    def _record(self, seconds):
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def _start_call(self):
+        with self._lock:
+            self.calls += 1
+
+    def _try_start_hedge(self, max_running=None, admit=None):
+        """Count a hedge if the budget, a free worker (when max_running is given) and admit() allow it."""
+        with self._lock:
+            if self.hedges + 1 > self.calls * self.max_ratio:
+                return False
+            if max_running is not None and self._hedges_running >= max_running:
+                return False
+            if admit is not None and not admit():
+                return False
+            if max_running is not None:
+                self._hedges_running += 1
+            self.hedges += 1
+            return True
+
+    def _hedge_finished(self):
+        with self._lock:
+            self._hedges_running -= 1
+
+    def _hedge_won(self):
+        with self._lock:
+            self.hedge_wins += 1
+
+    async def run(self, call, admit=None):
+        """Await call() (a coroutine function), hedging it with a second call() if slow."""
+        self._start_call()
+        delay = self.hedge_delay()
+
+        async def timed(start):
+            result = await call()
+            self._record(time.monotonic() - start)
+            return result
+
+        primary_start = time.monotonic()
+        primary = asyncio.ensure_future(timed(primary_start))
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._try_start_hedge(admit=admit):
+            return await primary
+
+        hedge = asyncio.ensure_future(timed(time.monotonic()))
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._hedge_won()
+                        return task.result()
+            # A failed attempt only counts once the other one has failed too
+            return primary.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if primary in pending:
+                # The slow primary never finishes, but its time so far is still a
+                # tail sample; dropping it would drag the hedge delay down
+                self._record(time.monotonic() - primary_start)
+
+    def run_sync(self, call, admit=None):
+        """Blocking counterpart of run for threaded servers; call is a plain function.
+
+        The primary gets a thread of its own, so it starts at once instead of
+        queueing behind other callers, and the hedge delay is pure upstream
+        time. The max_workers pool only runs hedges, and none is sent while
+        all of its workers are busy. The losing attempt can't be interrupted,
+        so it finishes in the background and its result is discarded.
+        """
+        self._start_call()
+        delay = self.hedge_delay()
+        if delay is None:
+            start = time.monotonic()
+            result = call()
+            self._record(time.monotonic() - start)
+            return result
+
+        def timed():
+            start = time.monotonic()
+            result = call()
+            self._record(time.monotonic() - start)
+            return result
+
+        primary = concurrent.futures.Future()
+
+        def run_primary():
+            try:
+                primary.set_result(timed())
+            except BaseException as e:
+                primary.set_exception(e)
+
+        threading.Thread(target=run_primary, name='hedge-primary', daemon=True).start()
+        done, _ = concurrent.futures.wait({primary}, timeout=delay)
+        if done or not self._try_start_hedge(max_running=self.max_workers, admit=admit):
+            return primary.result()
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = concurrent.futures.ThreadPoolExecutor(self.max_workers, thread_name_prefix='hedge')
+
+        def timed_hedge():
+            try:
+                return timed()
+            finally:
+                self._hedge_finished()
+
+        hedge = self._executor.submit(timed_hedge)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._hedge_won()
+                    return future.result()
+        return primary.result()
+
+    def render_metrics(self, prefix):
+        """Return hedge counters and the current hedge delay as Prometheus text lines."""
+        delay = self.hedge_delay()
+        with self._lock:
+            values = {
+                "calls_total": ("counter", self.calls),
+                "hedges_total": ("counter", self.hedges),
+                "hedge_wins_total": ("counter", self.hedge_wins),
+                "delay_seconds": ("gauge", delay if delay is not None else 0.0)
+            }
+        lines = []
+        for name, (kind, value) in values.items():
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name} {value}")
+        return lines
@@ -0,0 +1,175 @@
+import asyncio
+import random
+import threading
+import time
+
+# Upstream statuses worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GatewayBusy(Exception):
+    """Raised immediately when the wait queue is full; callers should answer 503."""
+
+    def __init__(self, retry_after):
+        super().__init__("Upstream wait queue is full.")
+        self.retry_after = retry_after
+
+
+def upstream_status(error):
+    """Return (HTTP status, Retry-After seconds) for an upstream error, either may be None.
+
+    Understands requests' HTTPError (error.response) as well as Gemini SDK and
+    fake-backend errors, which carry the status in error.code.
+    """
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "code", None)
+    if not isinstance(status, int):
+        status = None
+
+    retry_after = None
+    headers = getattr(response, "headers", None)
+    if headers and headers.get("Retry-After"):
+        try:
+            retry_after = float(headers["Retry-After"])
+        except ValueError:
+            pass  # HTTP-date form; fall back to our own backoff
+    return status, retry_after
+
+
+class UpstreamGateway:
+    """Admission control in front of an upstream API.
+
+    A token bucket sized to the quota (rate_per_second, burst) paces calls.
+    Callers beyond the bucket wait in a bounded queue; once max_queue callers
+    are waiting, new ones get GatewayBusy right away instead of piling on.
+    Retryable failures (429/5xx) are retried with exponential backoff and full
+    jitter, never sooner than the upstream's Retry-After. A Retry-After longer
+    than backoff_cap isn't waited out: the error goes straight back to the
+    caller, which answers 503 with that Retry-After. Works from threads (call)
+    and from asyncio (call_async).
+
+    Pass a Hedger as hedger= to hedge idempotent calls. Only the upstream
+    attempt itself is hedged, so the hedge delay never includes queueing or
+    retry backoff, and a hedge is only sent if a token is free right away.
+    """
+
+    def __init__(self, rate_per_second=5.0, burst=10, max_queue=50, max_retries=3,
+                 backoff_base=0.5, backoff_cap=20.0):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self.queue_depth = 0
+        self.calls = 0
+        self.retries = 0
+        self.rejected = 0
+        self.failures = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self):
+        """Reserve the next token and return how long to wait for it, or raise GatewayBusy."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1 and self.queue_depth >= self.max_queue:
+                self.rejected += 1
+                raise GatewayBusy((1 - self._tokens) / self.rate)
+            # A negative balance is the backlog of callers already holding reservations
+            self._tokens -= 1
+            self.calls += 1
+            if self._tokens >= 0:
+                return 0.0
+            self.queue_depth += 1
+            return -self._tokens / self.rate
+
+    def try_acquire(self):
+        """Take a token only if one is free now and nobody is queued; for optional calls such as hedges."""
+        with self._lock:
+            self._refill()
+            if self._tokens < 1 or self.queue_depth:
+                return False
+            self._tokens -= 1
+            self.calls += 1
+            return True
+
+    def _dequeue(self):
+        with self._lock:
+            self.queue_depth -= 1
+
+    def _retry_delay(self, error, attempt):
+        """Return seconds to wait before retrying error, or None if it shouldn't be retried."""
+        status, retry_after = upstream_status(error)
+        with self._lock:
+            if (status not in RETRYABLE_STATUSES or attempt >= self.max_retries
+                    or (retry_after or 0) > self.backoff_cap):
+                self.failures += 1
+                return None
+            self.retries += 1
+        backoff = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+        return max(backoff, retry_after or 0)
+
+    def call(self, fn, *args, hedger=None, **kwargs):
+        """Run the blocking fn(*args, **kwargs) under admission control and retries."""
+        attempt = 0
+        while True:
+            wait = self._reserve()
+            if wait:
+                try:
+                    time.sleep(wait)
+                finally:
+                    self._dequeue()
+            try:
+                if hedger is not None:
+                    return hedger.run_sync(lambda: fn(*args, **kwargs), admit=self.try_acquire)
+                return fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    async def call_async(self, fn, *args, hedger=None, **kwargs):
+        """Like call, but awaits the awaitable returned by fn(*args, **kwargs)."""
+        attempt = 0
+        while True:
+            wait = self._reserve()
+            if wait:
+                try:
+                    await asyncio.sleep(wait)
+                finally:
+                    self._dequeue()
+            try:
+                if hedger is not None:
+                    return await hedger.run(lambda: fn(*args, **kwargs), admit=self.try_acquire)
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def render_metrics(self, prefix):
+        """Return queue depth and retry counters as Prometheus text lines."""
+        with self._lock:
+            values = {
+                "queue_depth": ("gauge", self.queue_depth),
+                "calls_total": ("counter", self.calls),
+                "retries_total": ("counter", self.retries),
+                "rejected_total": ("counter", self.rejected),
+                "failures_total": ("counter", self.failures)
+            }
+        lines = []
+        for name, (kind, value) in values.items():
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            lines.append(f"{prefix}_{name} {value}")
+        return lines